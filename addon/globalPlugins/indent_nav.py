@@ -12,9 +12,11 @@
 # Original author: Sean Mealin <spmealin@gmail.com>
 
 import addonHandler
+import bisect
 import api
 import controlTypes
 import config
+import core
 import ctypes
 import globalPluginHandler
 import gui
@@ -28,6 +30,8 @@ from scriptHandler import script
 import speech
 import struct
 import textInfos
+import textInfos.offsets
+import time
 import tones
 import ui
 import wx
@@ -100,6 +104,118 @@ class SettingsDialog(gui.SettingsDialog):
         config.conf["indentnav"]["noNextTextMessage"] = self.noNextTextMessageCheckbox.Value
         super(SettingsDialog, self).onOk(evt)
 
+class OutlineListCtrl(wx.ListCtrl):
+    """
+    Virtual list control - items are rendered on demand, so that even documents with hundreds of thousands of lines open instantly.
+    """
+    def __init__(self, parent):
+        super(OutlineListCtrl, self).__init__(parent, size=(700, 400), style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL)
+        # Translators: Column header for line number in the outline dialog
+        self.InsertColumn(0, _("Line"), width=80)
+        # Translators: Column header for nesting depth in the outline dialog
+        self.InsertColumn(1, _("Depth"), width=60)
+        # Translators: Column header for line text in the outline dialog
+        self.InsertColumn(2, _("Text"), width=600)
+        self.lines = []
+        self.nestingDepths = []
+        self.indices = []
+
+    def setItems(self, lines, nestingDepths, indices):
+        """
+        @param nestingDepths: 1-based nesting depth of every line, so that screen reader users can hear the hierarchy,
+        since leading whitespace of list items is not spoken.
+        """
+        self.lines = lines
+        self.nestingDepths = nestingDepths
+        self.indices = indices
+        self.SetItemCount(len(indices))
+        self.Refresh()
+
+    def OnGetItemText(self, item, column):
+        lineIndex = self.indices[item]
+        if column == 0:
+            return str(lineIndex + 1)
+        if column == 1:
+            return str(self.nestingDepths[lineIndex])
+        return self.lines[lineIndex]
+
+class OutlineDialog(wx.Dialog):
+    def __init__(self, parent, lines, levels, currentLine):
+        # Translators: Title for the outline dialog
+        super(OutlineDialog, self).__init__(parent, title=_("IndentNav outline"))
+        self.lines = lines
+        self.levels = levels
+        self.currentLine = currentLine
+        self.selectedLine = None
+        self.depths = sorted(set(level for level in levels if level is not None))
+        self.nestingDepths = self.getNestingDepths(levels)
+        mainSizer = wx.BoxSizer(wx.VERTICAL)
+        sHelper = gui.guiHelper.BoxSizerHelper(self, orientation=wx.VERTICAL)
+        # Translators: Choice of indentation level in the outline dialog
+        choices = [_("All levels")] + [_("Indent {}").format(depth) for depth in self.depths]
+        # Translators: Label for indentation level choice in the outline dialog
+        self.levelChoice = sHelper.addLabeledControl(_("&Level:"), wx.Choice, choices=choices)
+        self.levelChoice.Bind(wx.EVT_CHOICE, self.onLevelChoice)
+        # Translators: Label for the list of lines in the outline dialog
+        self.listCtrl = sHelper.addLabeledControl(_("Li&nes:"), OutlineListCtrl)
+        self.listCtrl.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.onOk)
+        sHelper.addDialogDismissButtons(self.CreateButtonSizer(wx.OK | wx.CANCEL))
+        self.Bind(wx.EVT_BUTTON, self.onOk, id=wx.ID_OK)
+        mainSizer.Add(sHelper.sizer, border=gui.guiHelper.BORDER_FOR_DIALOGS, flag=wx.ALL)
+        self.SetSizer(mainSizer)
+        mainSizer.Fit(self)
+
+        currentLevel = levels[currentLine]
+        if currentLevel is not None:
+            self.levelChoice.SetSelection(self.depths.index(currentLevel) + 1)
+        else:
+            self.levelChoice.SetSelection(0)
+        self.updateList()
+        self.listCtrl.SetFocus()
+
+    def getNestingDepths(self, levels):
+        """
+        Returns 1-based nesting depth of every line, that is the number of its parents plus one, or None for blank lines.
+        """
+        result = []
+        parents = []
+        for level in levels:
+            if level is None:
+                result.append(None)
+                continue
+            while len(parents) > 0 and parents[-1] >= level:
+                parents.pop()
+            result.append(len(parents) + 1)
+            parents.append(level)
+        return result
+
+    def onLevelChoice(self, evt):
+        self.updateList()
+
+    def updateList(self):
+        selection = self.levelChoice.GetSelection()
+        if selection <= 0:
+            indices = [i for i, level in enumerate(self.levels) if level is not None]
+        else:
+            depth = self.depths[selection - 1]
+            indices = [i for i, level in enumerate(self.levels) if level == depth]
+        self.listCtrl.setItems(self.lines, self.nestingDepths, indices)
+        if len(indices) == 0:
+            return
+        # Select the last listed line at or before the caret
+        item = max(0, bisect.bisect_right(indices, self.currentLine) - 1)
+        self.listCtrl.Select(item)
+        self.listCtrl.Focus(item)
+
+    def onOk(self, evt):
+        item = self.listCtrl.GetFirstSelected()
+        if item < 0:
+            item = self.listCtrl.GetFocusedItem()
+        if item < 0:
+            return
+        self.selectedLine = self.listCtrl.indices[item]
+        self.EndModal(wx.ID_OK)
+
 # Browse mode constants:
 BROWSE_MODES = [
     _("horizontal offset"),
@@ -149,24 +265,61 @@ class Beeper:
     PAUSE_LEN = 5 # millis
     MAX_CRACKLE_LEN = 400 # millis
     MAX_BEEP_COUNT = MAX_CRACKLE_LEN // (BEEP_LEN + PAUSE_LEN)
+    MAX_OVERVIEW_LEN = 3000 # millis
+    MAX_OVERVIEW_BEEP_COUNT = MAX_OVERVIEW_LEN // (BEEP_LEN + PAUSE_LEN)
+    OVERVIEW_CACHE_SIZE = 10
 
+    def __init__(self):
+        self.overviewCache = {}
 
     def fancyCrackle(self, levels, volume):
         levels = self.uniformSample(levels, self.MAX_BEEP_COUNT )
+        buf = self.renderCrackle(levels, volume)
+        tones.player.stop()
+        tones.player.feed(buf)
+
+    def renderCrackle(self, levels, volume):
+        """
+        Renders a beep for every level. None levels are rendered as silence.
+        """
         beepLen = self.BEEP_LEN
         pauseLen = self.PAUSE_LEN
         pauseBufSize = NVDAHelper.generateBeep(None,self.BASE_FREQ,pauseLen,0, 0)
-        beepBufSizes = [NVDAHelper.generateBeep(None,self.getPitch(l), beepLen, volume, volume) for l in levels]
+        silenceBufSize = NVDAHelper.generateBeep(None,self.BASE_FREQ,beepLen,0, 0)
+        beepBufSizes = [
+            silenceBufSize if l is None else NVDAHelper.generateBeep(None,self.getPitch(l), beepLen, volume, volume)
+            for l in levels
+        ]
         bufSize = sum(beepBufSizes) + len(levels) * pauseBufSize
         buf = ctypes.create_string_buffer(bufSize)
         bufPtr = 0
         for l in levels:
-            bufPtr += NVDAHelper.generateBeep(
-                ctypes.cast(ctypes.byref(buf, bufPtr), ctypes.POINTER(ctypes.c_char)),
-                self.getPitch(l), beepLen, volume, volume)
+            if l is None:
+                bufPtr += silenceBufSize
+            else:
+                bufPtr += NVDAHelper.generateBeep(
+                    ctypes.cast(ctypes.byref(buf, bufPtr), ctypes.POINTER(ctypes.c_char)),
+                    self.getPitch(l), beepLen, volume, volume)
             bufPtr += pauseBufSize # add a short pause
+        return buf.raw
+
+    def overview(self, key, getLevels, volume):
+        """
+        Plays indentation profile of a range of lines compressed into a single sweep.
+        @param key: identifies document snapshot and range of lines; rendered sound is cached under this key.
+        @param getLevels: function returning indent levels of all the lines in the range, None for blank lines.
+        It is only called when the sound is not cached yet.
+        """
+        key = key + (volume,)
+        buf = self.overviewCache.get(key)
+        if buf is None:
+            levels = self.maxPool(getLevels(), self.MAX_OVERVIEW_BEEP_COUNT)
+            buf = self.renderCrackle(levels, volume)
+            if len(self.overviewCache) >= self.OVERVIEW_CACHE_SIZE:
+                del self.overviewCache[next(iter(self.overviewCache))]
+            self.overviewCache[key] = buf
         tones.player.stop()
-        tones.player.feed(buf.raw)
+        tones.player.feed(buf)
 
     def simpleCrackle(self, n, volume):
         return self.fancyCrackle([0] * n, volume)
@@ -210,6 +363,21 @@ class Beeper:
         packed = struct.pack("<%dQ" % (bufSize // intSize), *result)
         tones.player.feed(packed)
 
+    def maxPool(self, a, m):
+        """
+        Splits a into m consecutive bins and returns maximum of every bin,
+        so that short deeply indented blocks are not lost, as they could be with uniformSample.
+        None values are ignored; a bin containing only None values yields None.
+        """
+        n = len(a)
+        if n <= m:
+            return a
+        result = []
+        for i in range(m):
+            values = [x for x in a[i * n // m : (i + 1) * n // m] if x is not None]
+            result.append(max(values) if len(values) > 0 else None)
+        return result
+
     def uniformSample(self, a, m):
         n = len(a)
         if n <= m:
@@ -221,62 +389,117 @@ class Beeper:
         return result
 
 
+class LineLimitExceeded(Exception):
+    pass
+
 class TraditionalLineManager:
     """
-    This class is no longer used - please use FastLineManager instead.
+    Moves line by line through the document. Each move costs a few calls to the control,
+    but the document is never retrieved as a whole, so short jumps are cheap even in huge documents.
     """
-    def __init__(self):
-        pass
+    def __init__(self, callback=None, maxLines=None):
+        """
+        @param maxLines: LineLimitExceeded is raised when trying to move further than this many lines.
+        """
+        self.callback = callback
+        self.maxLines = maxLines
 
     def __enter__(self):
         focus = api.getFocusObject()
         self.textInfo = focus.makeTextInfo(textInfos.POSITION_CARET)
+        self.linesMoved = 0
+        self.movingTime = 0.0
         return self
 
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        pass
+        if self.callback is not None:
+            self.callback(self, exc_type)
 
     def move(self, increment):
+        if self.maxLines is not None and self.linesMoved >= self.maxLines:
+            raise LineLimitExceeded()
+        t0 = time.perf_counter()
         result = self.textInfo.move(textInfos.UNIT_LINE, increment)
+        self.movingTime += time.perf_counter() - t0
+        if result != 0:
+            self.linesMoved += 1
         return result
 
     def getText(self):
+        t0 = time.perf_counter()
         self.textInfo.expand(textInfos.UNIT_LINE)
-        return self.textInfo.text
+        result = self.textInfo.text
+        self.movingTime += time.perf_counter() - t0
+        return result
 
     def getLine(self):
         return self.textInfo.copy()
 
     def updateCaret(self, line):
-        line.updateCaret()
+        line = self.getTextInfo(line)
+        caret = line.copy()
+        caret.collapse()
+        caret.updateCaret()
+        return line
+
+    def getTextInfo(self, line=None):
+        if line is None:
+            line = self.textInfo
+        textInfo = line.copy()
+        textInfo.expand(textInfos.UNIT_LINE)
+        return textInfo
 
 class FastLineManager:
-    def __init__(self):
-        pass
+    """
+    Retrieves the whole document at once and then moves within the list of lines.
+    """
+    def __init__(self, callback=None, withCaret=True):
+        """
+        @param withCaret: when False, caret position is not retrieved, which saves fetching the text up to the caret.
+        Current line is then the first line, and caret related methods, such as updateCaret, cannot be used.
+        """
+        self.callback = callback
+        self.withCaret = withCaret
 
     def __enter__(self):
+        t0 = time.perf_counter()
         focus = api.getFocusObject()
+        self.focus = focus
         document = focus.makeTextInfo(textInfos.POSITION_ALL)
-        pretext = focus.makeTextInfo(textInfos.POSITION_CARET)
-        pretext.setEndPoint(document, "startToStart")
-        self.lineIndex = len(self.normalizeString(pretext.text).split("\n")) - 1
+        if self.withCaret:
+            pretext = focus.makeTextInfo(textInfos.POSITION_CARET)
+            pretext.setEndPoint(document, "startToStart")
+            self.lineIndex = len(self.normalizeString(pretext.text).split("\n")) - 1
+        else:
+            self.lineIndex = 0
         self.originalLineIndex = self.lineIndex
-        text = self.normalizeString(document.text)
+        self.rawText = document.text
+        self.lineOffsets = None
+        # Controls may count offsets in UTF-16 code units, which differ from Python offsets beyond the BMP
+        self.offsetsReliable = re.search("[\U00010000-\U0010FFFF]", self.rawText) is None
+        text = self.normalizeString(self.rawText)
         self.lines = text.split("\n")
         self.nLines = len(self.lines)
-        self.originalCaret = focus.makeTextInfo(textInfos.POSITION_CARET)
-        self.originalCaret.expand(textInfos.UNIT_LINE)
+        if self.withCaret:
+            self.originalCaret = focus.makeTextInfo(textInfos.POSITION_CARET)
+            self.originalCaret.expand(textInfos.UNIT_LINE)
+        else:
+            self.originalCaret = None
+        self.linesMoved = 0
+        self.fetchTime = time.perf_counter() - t0
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        pass
+        if self.callback is not None:
+            self.callback(self, exc_type)
 
     def move(self, increment):
         newIndex = self.lineIndex + increment
         if (newIndex < 0) or (newIndex >= self.nLines):
             return 0
         self.lineIndex = newIndex
+        self.linesMoved += 1
         return increment
 
     def getText(self):
@@ -295,6 +518,9 @@ class FastLineManager:
     def getTextInfo(self, line=None):
         if line is None:
             line = self.lineIndex
+        textInfo = self.getTextInfoByOffset(line)
+        if textInfo is not None:
+            return textInfo
         delta = line - self.originalLineIndex
         textInfo = self.originalCaret.copy()
         result = textInfo.move(textInfos.UNIT_LINE, delta)
@@ -303,20 +529,187 @@ class FastLineManager:
         textInfo.expand(textInfos.UNIT_LINE)
         return textInfo
 
+    def getLineOffsets(self):
+        if self.lineOffsets is None:
+            offsets = [0]
+            offsets.extend(m.end() for m in re.finditer("\r\n|\r|\n", self.rawText))
+            self.lineOffsets = offsets
+        return self.lineOffsets
+
+    def getTextInfoByOffset(self, line):
+        """
+        Positions textInfo directly by character offset, which is much faster than moving line by line.
+        Returns None if the control doesn't support offsets or if its offsets don't match document text.
+        """
+        if not self.offsetsReliable:
+            return None
+        offset = self.getLineOffsets()[line]
+        try:
+            textInfo = self.focus.makeTextInfo(textInfos.offsets.Offsets(offset, offset))
+            textInfo.expand(textInfos.UNIT_LINE)
+            bookmark = textInfo.bookmark
+            text = self.normalizeString(textInfo.text)
+        except Exception:
+            return None
+        # Matching text alone is not enough: neighbouring lines might be identical.
+        # Line must also start exactly at the requested offset.
+        if not isinstance(bookmark, textInfos.offsets.Offsets) or bookmark.startOffset != offset:
+            return None
+        if text.rstrip("\n") != self.lines[line]:
+            return None
+        return textInfo
+
+    def getRevision(self):
+        """
+        Identifies this snapshot of the document - revision changes whenever document text changes.
+        """
+        return (self.focus.windowHandle, hash(self.rawText))
+
     def normalizeString(self, s):
         s = s.replace("\r\n", "\n")
         s = s.replace("\r", "\n")
         return s
 
+class LineManagerSelector:
+    """
+    Chooses between TraditionalLineManager and FastLineManager for every gesture.
+    The choice is based on the last known length of the document,
+    the expected number of lines the gesture is going to scan,
+    and latencies of both line managers, that are measured at runtime for every control class.
+    """
+    # Weight of the latest measurement in exponential moving averages
+    SMOOTHING = 0.3
+    # Weight of older samples in the fetch time regression
+    FETCH_DECAY = 0.9
+    DEFAULT_LINE_LATENCY = 0.002 # seconds per line moved by TraditionalLineManager
+    DEFAULT_FETCH_OVERHEAD = 0.01 # seconds per document retrieved by FastLineManager
+    DEFAULT_CHAR_LATENCY = 0.0000001 # seconds per character retrieved by FastLineManager
+    DEFAULT_BOUNDED_DISTANCE = 20 # lines
+
+    def __init__(self):
+        self.lineLatencies = {} # control class -> seconds per line
+        self.fetchStats = {} # control class -> decayed sums for regression of fetch time on document length
+        self.documentSizes = {} # window handle -> (document signature, characters, lines)
+        self.distances = {} # gesture kind -> lines scanned
+
+    def getGestureKind(self, controlClass, unbounded, moveCount):
+        return (controlClass, unbounded, moveCount > 1)
+
+    def getDocumentSignature(self, focus):
+        """
+        Returns story length if the control can report it without retrieving the whole text, otherwise None.
+        It tells apart different documents shown in the same window, such as tabs in Notepad++.
+        """
+        try:
+            document = focus.makeTextInfo(textInfos.POSITION_ALL)
+            if not isinstance(document, textInfos.offsets.OffsetsTextInfo):
+                return None
+            if type(document)._getStoryLength is textInfos.offsets.OffsetsTextInfo._getStoryLength:
+                # Default implementation retrieves the whole text
+                return None
+            return document._getStoryLength()
+        except Exception:
+            return None
+
+    def getLineManager(self, unbounded=False, moveCount=1, forceFast=False):
+        focus = api.getFocusObject()
+        controlClass = focus.windowClassName
+        windowHandle = focus.windowHandle
+        signature = self.getDocumentSignature(focus)
+        gestureKind = self.getGestureKind(controlClass, unbounded, moveCount)
+        def callback(lm, exc_type):
+            self.update(lm, exc_type, controlClass, windowHandle, signature, gestureKind)
+        if forceFast or windowHandle not in self.documentSizes:
+            # Document size is only learned by retrieving the whole document
+            return FastLineManager(callback)
+        if self.documentSizes[windowHandle][0] != signature:
+            # A different document, or the document has been edited since its size was learned
+            del self.documentSizes[windowHandle]
+            return FastLineManager(callback)
+        breakEvenDistance = self.estimateFastCost(controlClass, windowHandle) / self.getLineLatency(controlClass)
+        if self.estimateDistance(windowHandle, gestureKind) < breakEvenDistance:
+            # Past break-even distance TraditionalLineManager gives up, and the scan is redone with FastLineManager
+            return TraditionalLineManager(callback, maxLines=int(breakEvenDistance) + 1)
+        return FastLineManager(callback)
+
+    def getLineLatency(self, controlClass):
+        return max(self.lineLatencies.get(controlClass, self.DEFAULT_LINE_LATENCY), 1e-9)
+
+    def getFetchModel(self, controlClass):
+        """
+        Returns (overhead, latency per character) of retrieving the whole document.
+        Fixed overhead is separated from per character latency by least squares regression over recent fetches.
+        """
+        if controlClass not in self.fetchStats:
+            return (self.DEFAULT_FETCH_OVERHEAD, self.DEFAULT_CHAR_LATENCY)
+        w, sx, sy, sxx, sxy = self.fetchStats[controlClass]
+        meanX = sx / w
+        meanY = sy / w
+        varX = sxx / w - meanX ** 2
+        covXY = sxy / w - meanX * meanY
+        if varX > (0.1 * meanX) ** 2:
+            charLatency = max(0.0, covXY / varX)
+        else:
+            # Documents of similar size only - cannot tell overhead from per character latency
+            charLatency = self.DEFAULT_CHAR_LATENCY
+        overhead = max(0.0, meanY - charLatency * meanX)
+        return (overhead, charLatency)
+
+    def estimateFastCost(self, controlClass, windowHandle):
+        signature, nChars, nLines = self.documentSizes[windowHandle]
+        overhead, charLatency = self.getFetchModel(controlClass)
+        return overhead + nChars * charLatency
+
+    def estimateDistance(self, windowHandle, gestureKind):
+        signature, nChars, nLines = self.documentSizes[windowHandle]
+        controlClass, unbounded, far = gestureKind
+        if unbounded or far:
+            defaultDistance = nLines
+        else:
+            defaultDistance = self.DEFAULT_BOUNDED_DISTANCE
+        return min(nLines, self.distances.get(gestureKind, defaultDistance))
+
+    def update(self, lm, exc_type, controlClass, windowHandle, signature, gestureKind):
+        if exc_type is None:
+            # An aborted scan doesn't tell how far the gesture would have gone
+            self.updateAverage(self.distances, gestureKind, lm.linesMoved)
+        if isinstance(lm, FastLineManager):
+            nChars = len(lm.rawText)
+            self.documentSizes[windowHandle] = (signature, nChars, lm.nLines)
+            self.updateFetchStats(controlClass, nChars, lm.fetchTime)
+        elif lm.linesMoved > 0:
+            self.updateAverage(self.lineLatencies, controlClass, lm.movingTime / lm.linesMoved)
+
+    def updateAverage(self, averages, key, value):
+        if key in averages:
+            value = (1 - self.SMOOTHING) * averages[key] + self.SMOOTHING * value
+        averages[key] = value
+
+    def updateFetchStats(self, controlClass, nChars, fetchTime):
+        stats = [self.FETCH_DECAY * x for x in self.fetchStats.get(controlClass, [0.0] * 5)]
+        stats[0] += 1
+        stats[1] += nChars
+        stats[2] += fetchTime
+        stats[3] += nChars ** 2
+        stats[4] += nChars * fetchTime
+        self.fetchStats[controlClass] = stats
+
 class EditableIndentNav(NVDAObject):
     scriptCategory = _("IndentNav")
     beeper = Beeper()
+    lineManagerSelector = LineManagerSelector()
     def getIndentLevel(self, s):
         if speech.isBlank(s):
             return 0
         indent = speech.splitTextIndentation(s)[0]
         return len(indent.replace("\t", " " * 4))
 
+    def getIndentLevels(self, lines):
+        """
+        Returns indent level of every line, or None for blank lines.
+        """
+        return [None if speech.isBlank(s) else self.getIndentLevel(s) for s in lines]
+
     def isReportIndentWithTones(self):
         return config.conf["documentFormatting"]["reportLineIndentationWithTones"]
 
@@ -391,55 +784,76 @@ class EditableIndentNav(NVDAObject):
         self.moveInEditable(increment, errorMessages[0], unbounded, op, speakOnly=speakOnly, moveCount=moveCount)
 
     def moveInEditable(self, increment, errorMessage, unbounded=False, op=operator.eq, speakOnly=False, moveCount=1):
-        with self.getLineManager() as lm:
-            # Get the current indentation level
+        self.runWithLineManager(
+            lambda lm: self.moveWithLineManager(lm, increment, errorMessage, unbounded, op, speakOnly, moveCount),
+            unbounded=unbounded,
+            moveCount=moveCount,
+        )
+
+    def moveWithLineManager(self, lm, increment, errorMessage, unbounded, op, speakOnly, moveCount):
+        # Get the current indentation level
+        text = lm.getText()
+        indentationLevel = self.getIndentLevel(text)
+        onEmptyLine = speech.isBlank(text)
+
+        # Scan each line until we hit the end of the indentation block, the end of the edit area, or find a line with the same indentation level
+        found = False
+        indentLevels = []
+        while True:
+            result = lm.move(increment)
+            if result == 0:
+                break
             text = lm.getText()
-            indentationLevel = self.getIndentLevel(text)
-            onEmptyLine = speech.isBlank(text)
-
-            # Scan each line until we hit the end of the indentation block, the end of the edit area, or find a line with the same indentation level
-            found = False
-            indentLevels = []
-            while True:
-                result = lm.move(increment)
-                if result == 0:
+            newIndentation = self.getIndentLevel(text)
+
+            # Skip over empty lines if we didn't start on one.
+            if not onEmptyLine and speech.isBlank(text):
+                continue
+
+            if op(newIndentation, indentationLevel):
+                # Found it
+                found = True
+                indentationLevel = newIndentation
+                resultLine = lm.getLine()
+                resultText = lm.getText()
+                moveCount -= 1
+                if moveCount == 0:
                     break
-                text = lm.getText()
-                newIndentation = self.getIndentLevel(text)
-
-                # Skip over empty lines if we didn't start on one.
-                if not onEmptyLine and speech.isBlank(text):
-                    continue
-
-                if op(newIndentation, indentationLevel):
-                    # Found it
-                    found = True
-                    indentationLevel = newIndentation
-                    resultLine = lm.getLine()
-                    resultText = lm.getText()
-                    moveCount -= 1
-                    if moveCount == 0:
-                        break
-                elif newIndentation < indentationLevel:
-                    # Not found in this indentation block
-                    if not unbounded:
-                        break
-                indentLevels.append(newIndentation )
-
-            if found:
-                textInfo = None
-                if not speakOnly:
-                    textInfo = lm.updateCaret(resultLine)
-                self.crackle(indentLevels)
-                if textInfo is not None:
-                    speech.speakTextInfo(textInfo, unit=textInfos.UNIT_LINE)
-                else:
-                    speech.speakText(resultText)
+            elif newIndentation < indentationLevel:
+                # Not found in this indentation block
+                if not unbounded:
+                    break
+            indentLevels.append(newIndentation )
+
+        if found:
+            textInfo = None
+            if not speakOnly:
+                textInfo = lm.updateCaret(resultLine)
+            self.crackle(indentLevels)
+            if textInfo is not None:
+                speech.speakTextInfo(textInfo, unit=textInfos.UNIT_LINE)
             else:
-                self.endOfDocument(errorMessage)
+                speech.speakText(resultText)
+        else:
+            self.endOfDocument(errorMessage)
 
-    def getLineManager(self):
-        return FastLineManager()
+    def getLineManager(self, unbounded=False, moveCount=1, forceFast=False):
+        return self.lineManagerSelector.getLineManager(unbounded=unbounded, moveCount=moveCount, forceFast=forceFast)
+
+    def runWithLineManager(self, func, unbounded=False, moveCount=1):
+        """
+        Calls func with a line manager and returns its result.
+        func must not have any side effects before it finishes scanning,
+        since it is called again with FastLineManager if TraditionalLineManager gives up.
+        """
+        try:
+            with self.getLineManager(unbounded=unbounded, moveCount=moveCount) as lm:
+                return func(lm)
+        except LineLimitExceeded:
+            # Scan went past break-even distance - retrieving the whole document is cheaper from here
+            pass
+        with self.getLineManager(unbounded=unbounded, moveCount=moveCount, forceFast=True) as lm:
+            return func(lm)
 
     @script(description="Moves to the next line with a greater indentation level than the current line within the current indentation block.", gestures=['kb:NVDA+alt+RightArrow'])
     def script_moveToChild(self, gesture):
@@ -483,44 +897,109 @@ class EditableIndentNav(NVDAObject):
             textInfo = focus.makeTextInfo(textInfos.POSITION_SELECTION)
             api.copyToClip(textInfo.text)
             ui.message(successMessage)
-        with self.getLineManager() as lm:
-            # Get the current indentation level
+        # Selecting multiple blocks can scan arbitrarily far, just like unbounded moves
+        self.runWithLineManager(
+            lambda lm: self.selectWithLineManager(lm, selectMultiple),
+            unbounded=selectMultiple,
+        )
+
+    def selectWithLineManager(self, lm, selectMultiple):
+        # Get the current indentation level
+        text = lm.getText()
+        originalTextInfo = lm.getTextInfo()
+        indentationLevel = self.getIndentLevel(text)
+        onEmptyLine = speech.isBlank(text)
+        if onEmptyLine:
+            return self.endOfDocument(_("Nothing to select"))
+        # Scan each line forward as long as indentation level is greater than current
+        withinHeading = True
+        line = None
+        indentLevels = []
+        while True:
+            result = lm.move(1)
+            if result == 0:
+                break
             text = lm.getText()
-            originalTextInfo = lm.getTextInfo()
-            indentationLevel = self.getIndentLevel(text)
-            onEmptyLine = speech.isBlank(text)
-            if onEmptyLine:
-                return self.endOfDocument(_("Nothing to select"))
-            # Scan each line forward as long as indentation level is greater than current
-            withinHeading = True
-            line = None
-            indentLevels = []
-            while True:
-                result = lm.move(1)
-                if result == 0:
+            newIndentation = self.getIndentLevel(text)
+
+            if  speech.isBlank(text):
+                continue
+
+            if newIndentation < indentationLevel:
+                break
+            elif newIndentation == indentationLevel:
+                if not withinHeading and not selectMultiple:
                     break
+            else: # newIndentation > indentationLevel
+                withinHeading = False
+            line = lm.getLine()
+            indentLevels.append(newIndentation )
+        selection = originalTextInfo.copy()
+        if line is not None:
+            textInfo = lm.getTextInfo(line)
+            selection.setEndPoint(textInfo, "endToEnd")
+        selection.updateSelection()
+        self.crackle(indentLevels)
+        speech.speakTextInfo(textInfo, unit=textInfos.UNIT_LINE)
+
+    @script(description="Show outline of all lines at chosen indentation level.", gestures=['kb:NVDA+alt+o'])
+    def script_showOutline(self, gesture):
+        lm = FastLineManager()
+        with lm:
+            levels = self.getIndentLevels(lm.lines)
+        dialog = OutlineDialog(gui.mainFrame, lm.lines, levels, lm.lineIndex)
+        def onDialogClosed(result):
+            if result == wx.ID_OK and dialog.selectedLine is not None:
+                self.jumpToLine(lm, dialog.selectedLine)
+        gui.runScriptModalDialog(dialog, onDialogClosed)
+
+    @script(description="Play indentation overview of current block. Press twice to play indentation overview of the whole document.", gestures=['kb:NVDA+alt+p'])
+    def script_playIndentOverview(self, gesture):
+        count=scriptHandler.getLastScriptRepeatCount()
+        wholeDocument = count >= 1
+        volume = getConfig("crackleVolume")
+        with FastLineManager(withCaret=not wholeDocument) as lm:
+            if wholeDocument:
+                start, end = 0, lm.nLines
+            else:
                 text = lm.getText()
-                newIndentation = self.getIndentLevel(text)
+                if speech.isBlank(text):
+                    # Translators: error message if indentation overview is requested on a blank line
+                    return self.endOfDocument(_("No indentation block"))
+                start, end = lm.lineIndex, self.getBlockEnd(lm.lines, lm.lineIndex)
+            lines = lm.lines
+            self.beeper.overview(
+                lm.getRevision() + (start, end),
+                lambda: self.getIndentLevels(lines[start:end]),
+                volume=volume,
+            )
+
+    def getBlockEnd(self, lines, lineIndex):
+        """
+        Returns index of the line following indentation block that starts at lineIndex.
+        Trailing blank lines are not included in the block.
+        """
+        indentationLevel = self.getIndentLevel(lines[lineIndex])
+        end = lineIndex + 1
+        for i in range(lineIndex + 1, len(lines)):
+            if speech.isBlank(lines[i]):
+                continue
+            if self.getIndentLevel(lines[i]) <= indentationLevel:
+                break
+            end = i + 1
+        return end
 
-                if  speech.isBlank(text):
-                    continue
+    FOCUS_RETRY_DELAY = 50 # millis
+    FOCUS_RETRY_COUNT = 40
 
-                if newIndentation < indentationLevel:
-                    break
-                elif newIndentation == indentationLevel:
-                    if not withinHeading and not selectMultiple:
-                        break
-                else: # newIndentation > indentationLevel
-                    withinHeading = False
-                line = lm.getLine()
-                indentLevels.append(newIndentation )
-            selection = originalTextInfo.copy()
-            if line is not None:
-                textInfo = lm.getTextInfo(line)
-                selection.setEndPoint(textInfo, "endToEnd")
-            selection.updateSelection()
-            self.crackle(indentLevels)
-            speech.speakTextInfo(textInfo, unit=textInfos.UNIT_LINE)
+    def jumpToLine(self, lm, line, retries=FOCUS_RETRY_COUNT):
+        if api.getFocusObject() != lm.focus:
+            # Focus hasn't returned to the document yet
+            if retries > 0:
+                core.callLater(self.FOCUS_RETRY_DELAY, self.jumpToLine, lm, line, retries - 1)
+            return
+        textInfo = lm.updateCaret(line)
+        speech.speakTextInfo(textInfo, unit=textInfos.UNIT_LINE)
 
     def endOfDocument(self, message):
         volume = getConfig("noNextTextChimeVolume")